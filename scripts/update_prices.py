@@ -1,19 +1,28 @@
 #!/usr/bin/env python3
+import asyncio
 import json
 import time
 import os
 import logging
 import sys
 import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException, StaleElementReferenceException
 import re
-from datetime import datetime
+from datetime import datetime, timedelta
+from itertools import islice
+from urllib.parse import quote
 import functools
+import heapq
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 
@@ -24,35 +33,217 @@ try:
 except ImportError:
     WEBDRIVER_MANAGER_AVAILABLE = False
 
+# aiohttp（価格APIの非同期一括取得用）の安全なインポート
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+# orjson（C実装の高速JSON）の安全なインポート
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def retry_on_error(max_retries=2, delay=1):
-    """エラー時にリトライするデコレータ（高速化版）"""
+# 価格抽出に不要なリソース（CDPでブロック）
+BLOCKED_RESOURCE_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.webp", "*.gif", "*.svg",
+    "*.woff*", "*.ttf", "*.mp4", "*.css",
+    "*/analytics*", "*/gtag*"
+]
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36'
+
+# ボット検出対策（全ページの読み込み前に実行）
+STEALTH_JS = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined});"
+
+# 価格テキスト解析用（数字で始まる桁区切り付き数値）
+_PRICE_RE = re.compile(r"\d[\d,]*")
+_COMMA_STRIP = str.maketrans('', '', ',')
+_PREVIOUS_PRICE_STRIP = str.maketrans('', '', ', NESO')  # 保存済み価格の「1,234 NESO」表記用
+
+NAVIGATOR_URL = "https://msu.io/navigator"
+
+# 検索フィールドと検索結果の価格要素（待機条件用）
+SEARCH_INPUT_SELECTOR = "#form_search_input, input[type='text']"
+PRICE_NODE_SELECTOR = "p[class*='NesoBox_text']"
+FRESH_PRICE_SELECTOR = "p[class*='NesoBox_text']:not([data-stale-price])"
+
+# 価格要素のセレクター（優先順）
+PRICE_SELECTORS = [
+    "p._typography-point-body-m-medium_15szf_134._kartrider_3m7yu_9.NesoBox_text__lvOcl",
+    "p[class*='NesoBox_text']",
+    "p._typography-point-body-m-medium_15szf_134"
+]
+
+def _parse_price_text(price_text):
+    """価格テキストを整数に変換（数値が無ければNone）"""
+    price_text = price_text.strip()
+    if not price_text:
+        return None
+    
+    # 数値のみのテキストは正規表現を使わずに変換
+    # （isdecimalはint()が受け付ける文字のみ通すため例外処理は不要）
+    price_str = price_text.translate(_COMMA_STRIP)
+    if not price_str.isdecimal():
+        price_match = _PRICE_RE.search(price_text)
+        if not price_match:
+            return None
+        price_str = price_match.group().replace(',', '')
+    return int(price_str)
+
+@functools.lru_cache(maxsize=4096)
+def _parse_previous_price_text(price_str):
+    """保存済みの価格文字列を数値に変換（同じ価格文字列の再解析はキャッシュ）"""
+    try:
+        return int(price_str.translate(_PREVIOUS_PRICE_STRIP))
+    except ValueError:
+        return None
+
+def _collect_json_prices(obj, field):
+    """JSONレスポンスから指定フィールド名の値を再帰的に収集"""
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if key == field and isinstance(value, (int, float, str)) and not isinstance(value, bool):
+                yield value
+            else:
+                yield from _collect_json_prices(value, field)
+    elif isinstance(obj, list):
+        for value in obj:
+            yield from _collect_json_prices(value, field)
+
+def _quartiles(sorted_prices):
+    """ソート済み価格のQ1/Q3を算出（np.quantileの線形補間と同じ計算）"""
+    n = len(sorted_prices)
+    quartiles = []
+    for q in (0.25, 0.75):
+        pos = (n - 1) * q
+        lo = int(pos)
+        t = pos - lo
+        a = sorted_prices[lo]
+        b = sorted_prices[min(lo + 1, n - 1)]
+        diff = b - a
+        quartiles.append(b - diff * (1 - t) if t >= 0.5 else a + diff * t)
+    return quartiles
+
+# 🔥 この件数以下はNumPy配列を作らずPythonで分割（7データでは配列生成の方が高コスト）
+SMALL_PARTITION_SIZE = 8
+
+def _partition_prices(prices, lower_bound, upper_bound):
+    """境界内（正常値）と境界外（外れ値）に価格を分割"""
+    if len(prices) <= SMALL_PARTITION_SIZE:
+        normal = [p for p in prices if lower_bound <= p <= upper_bound]
+        outliers = [p for p in prices if not lower_bound <= p <= upper_bound]
+        return normal, outliers
+    
+    # ブールマスクで正常値/外れ値を一括分割
+    prices_array = np.asarray(prices)
+    mask = (prices_array >= lower_bound) & (prices_array <= upper_bound)
+    return prices_array[mask].tolist(), prices_array[~mask].tolist()
+
+# 追記ログから再利用する取得結果の有効期間
+UPDATES_LOG_MAX_AGE = timedelta(hours=1)
+
+SYSTEM_CHROMEDRIVER_PATH = '/usr/local/bin/chromedriver'
+
+_chromedriver_path = None
+_chromedriver_path_lock = threading.Lock()
+
+def _driver_path():
+    """ChromeDriverのパスを解決（全ワーカーで初回の1回のみ実行）"""
+    global _chromedriver_path
+    with _chromedriver_path_lock:
+        if _chromedriver_path is None:
+            if os.path.exists(SYSTEM_CHROMEDRIVER_PATH) or not WEBDRIVER_MANAGER_AVAILABLE:
+                _chromedriver_path = SYSTEM_CHROMEDRIVER_PATH
+            else:
+                # バージョン指定時はwebdriver-managerの最新版確認通信を省略
+                _chromedriver_path = ChromeDriverManager(
+                    driver_version=os.getenv('CHROMEDRIVER_VERSION') or None
+                ).install()
+        return _chromedriver_path
+
+# ドライバー/chromedriverとの通信エラー（chromedriver停止時はurllib3のMaxRetryErrorになる）
+DRIVER_SESSION_ERRORS = (WebDriverException, Urllib3HTTPError, ConnectionError)
+
+class NonRetryable(Exception):
+    """入力に対して確定的な失敗（リトライしても結果が変わらない）"""
+
+def retry_on_network_error(max_retries=2, delay=1):
+    """通信・ドライバーエラー時に指数バックオフでリトライするデコレータ"""
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            last_exception = None
             for attempt in range(1, max_retries + 1):
                 try:
                     return func(*args, **kwargs)
-                except Exception as e:
-                    last_exception = e
+                except NonRetryable:
+                    raise
+                except DRIVER_SESSION_ERRORS:
                     if attempt < max_retries:
                         logger.warning(f"Retry {attempt}/{max_retries}: {args[1] if len(args) > 1 else 'Unknown'}")
-                        time.sleep(delay)
+                        time.sleep(delay * 2 ** (attempt - 1))
                     else:
                         logger.error(f"Max retries reached: {args[1] if len(args) > 1 else 'Unknown'}")
-            raise last_exception
+                        raise
+        return wrapper
+    return decorator
+
+def retry_on_parse_error(max_retries=2):
+    """解析エラー時に待機なしで即リトライするデコレータ"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(1, max_retries + 1):
+                try:
+                    return func(*args, **kwargs)
+                except NonRetryable:
+                    raise
+                except (StaleElementReferenceException, ValueError, AttributeError):
+                    if attempt < max_retries:
+                        logger.warning(f"Parse retry {attempt}/{max_retries}: {func.__name__}")
+                    else:
+                        raise
         return wrapper
     return decorator
 
 class GitHubActionsUpdater:
     def __init__(self, json_file_path="data/equipment_prices.json"):
         self.json_file_path = json_file_path
+        # 取得済み価格の追記ログ（異常終了時は次回実行で再利用し、保存成功後に削除）
+        # ローカル実行専用: GitHub Actionsは毎回新規チェックアウトのため追記ログが残らず無効化
+        self.updates_log_path = os.path.splitext(json_file_path)[0] + '.updates.jsonl'
+        self.journal_updates = os.getenv('GITHUB_ACTIONS', '').lower() != 'true'
+        self._updates_log = None
         self.target_items_input = os.getenv('TARGET_ITEMS', 'ALL')
+        stale_hours_input = os.getenv('STALE_HOURS', '0')
+        try:
+            self.stale_hours = float(stale_hours_input)  # 0で無効（毎回全件更新）
+        except ValueError:
+            logger.warning(f"STALE_HOURSが不正なため無視: {stale_hours_input}")
+            self.stale_hours = 0.0
         self.updated_count = 0
-        self.lock = threading.Lock()
+        self.lock = threading.Lock()   # ドライバー一覧・レート制限の共有状態用
+        self._tls = threading.local()  # ワーカースレッドごとのドライバー保持
+        self._drivers = []             # 起動中の全ドライバー（終了処理用）
+        
+        # 価格API（設定時はSeleniumより優先、失敗時はSeleniumにフォールバック）
+        self.price_api_url = os.getenv('PRICE_API_URL', '')        # 例: https://.../search?keyword={name}
+        self.price_api_field = os.getenv('PRICE_API_FIELD', 'price')
+        self.use_async_api = bool(self.price_api_url) and AIOHTTP_AVAILABLE
+        self.api_concurrency = 20                                    # 非同期取得の同時接続数
+        self.api_429_retries = 3                                     # 429時にバックオフ後API再試行する回数
+        self.session = self.setup_session()
+        
+        # レート制限（429受信時のみ間隔を空ける）
+        self.rate_limiter = threading.Semaphore(4)   # API同時リクエスト数の上限
+        self._throttle_until = 0.0                   # time.monotonic()基準の再開時刻
+        self._throttle_backoff = 0.0
         
         # 🔥 修正1: 7データ対応の設定調整
         self.iqr_multiplier = 1.0              # 1.5 → 1.0 に厳格化
@@ -65,6 +256,7 @@ class GitHubActionsUpdater:
         self.top3_min_ratio = 20        # 上位3つ平均の1/20が絶対下限
         self.bottom3_max_ratio = 50     # 下位3つ平均の50倍が絶対上限
         self.final_price_ratio = 30     # 最高価格/最低価格の上限
+        self.tight_spread_ratio = 1.1   # 最高価格が最低価格のこの倍率以内ならIQRを省略
         
         # 並行処理復活（高速化優先）
         if self.target_items_input.upper() == 'ALL':
@@ -80,6 +272,26 @@ class GitHubActionsUpdater:
                 self.target_items = 10
                 self.use_parallel = False
                 self.max_workers = 2
+        
+        # ワーカー数の上書き（Chromeのメモリ使用量に合わせて調整、1ワーカー=1Chrome）
+        max_workers_input = os.getenv('MAX_WORKERS', '')
+        if max_workers_input:
+            try:
+                self.max_workers = max(1, int(max_workers_input))
+            except ValueError:
+                logger.warning(f"MAX_WORKERSが不正なため無視: {max_workers_input}")
+
+    def setup_session(self):
+        """価格API用HTTPセッションの設定（接続プール・自動リトライ）"""
+        session = requests.Session()
+        session.headers.update({'User-Agent': USER_AGENT, 'Accept': 'application/json'})
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(total=3, backoff_factor=2, status_forcelist=[500, 502, 503, 504])
+        )
+        session.mount('https://', adapter)
+        return session
 
     def setup_driver(self):
         """Seleniumドライバーの設定（高速化版）"""
@@ -92,9 +304,13 @@ class GitHubActionsUpdater:
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--window-size=1920,1080")
         
+        # DOMContentLoadedで制御を返す（以降の同期は要素待機で行う）
+        chrome_options.page_load_strategy = 'eager'
+        
         # 高速化設定
         chrome_options.add_argument("--disable-web-security")
-        chrome_options.add_argument("--disable-features=VizDisplayCompositor")
+        # --disable-featuresは最後の指定のみ有効なため1つにまとめる（サイト分離無効でタブあたりのプロセス数削減）
+        chrome_options.add_argument("--disable-features=VizDisplayCompositor,IsolateOrigins,site-per-process")
         chrome_options.add_argument("--disable-ipc-flooding-protection")
         chrome_options.add_argument("--disable-renderer-backgrounding")
         chrome_options.add_argument("--disable-backgrounding-occluded-windows")
@@ -112,15 +328,22 @@ class GitHubActionsUpdater:
         chrome_options.add_argument("--disable-blink-features=AutomationControlled")
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36')
+        chrome_options.add_argument(f'--user-agent={USER_AGENT}')
         
         # メモリ制限（並列処理対応）
         chrome_options.add_argument("--memory-pressure-off")
         chrome_options.add_argument("--max_old_space_size=2048")
         
+        # 画像読み込み・通知を無効化（価格テキストのみ必要）
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2
+        })
+        
         try:
-            # システムのChromeDriverを使用
-            service = Service('/usr/local/bin/chromedriver')
+            # システムのChromeDriverを使用（無い場合はwebdriver-manager）
+            service = Service(_driver_path())
             service.log_path = os.devnull
             
             driver = webdriver.Chrome(service=service, options=chrome_options)
@@ -129,8 +352,12 @@ class GitHubActionsUpdater:
             driver.set_page_load_timeout(20)
             driver.implicitly_wait(5)
             
-            # ボット検出対策（最小限）
-            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            # 画像・フォント・CSS・動画の通信をブロック（ページ転送量削減）
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_RESOURCE_PATTERNS})
+            
+            # ボット検出対策（最小限・以降の全ページに1回の登録で適用）
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": STEALTH_JS})
             
             return driver
             
@@ -138,134 +365,205 @@ class GitHubActionsUpdater:
             logger.error(f"ChromeDriver initialization failed: {e}")
             raise
 
-    def search_equipment_js(self, driver, equipment_name):
-        """JavaScriptを使用した検索実行（高速化版）"""
+    def ensure_on_navigator(self, driver, reload=False):
+        """ナビゲーターページを読み込み（ドライバーごとに初回のみ）"""
+        if getattr(driver, '_navigator_loaded', False) and not reload:
+            return
+        
+        driver.get(NAVIGATOR_URL)
+        
+        # 検索フィールドの出現を待機
+        WebDriverWait(driver, 15).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, SEARCH_INPUT_SELECTOR))
+        )
+        
+        # 初期表示の一覧が描画し終わる前に検索すると、後から描画された一覧を検索結果と誤認するため待機
+        self.wait_for_listing_settled(driver)
+        driver._navigator_loaded = True
+
+    def wait_for_listing_settled(self, driver, timeout=10):
+        """初期表示の価格一覧の描画完了を待機（価格要素の件数が変化しなくなるまで）"""
+        last_count = [-1]
+        
+        def settled(d):
+            count = d.execute_script(
+                "return document.querySelectorAll(arguments[0]).length;", PRICE_NODE_SELECTOR
+            )
+            stable = count > 0 and count == last_count[0]
+            last_count[0] = count
+            return stable
+        
         try:
-            # ページロード
-            driver.get("https://msu.io/navigator")
+            WebDriverWait(driver, timeout, poll_frequency=0.5).until(settled)
+        except TimeoutException:
+            # 初期一覧が表示されないページでも検索は可能
+            logger.warning("初期一覧の描画完了を確認できませんでした")
+
+    def perform_search(self, driver, equipment_name):
+        """読み込み済みページで検索を実行（検索フィールドが無ければNone、結果なしはFalse）"""
+        search_success = driver.execute_script("""
+            const searchSelectors = [
+                '#form_search_input',
+                'input[id="form_search_input"]',
+                'input[type="text"]'
+            ];
             
-            # ページの完全読み込みを待機（短縮）
-            WebDriverWait(driver, 15).until(
-                lambda d: d.execute_script("return document.readyState") == "complete"
-            )
+            let searchField = null;
+            for (const selector of searchSelectors) {
+                searchField = document.querySelector(selector);
+                if (searchField && searchField.offsetParent !== null) {
+                    break;
+                }
+            }
             
-            # 安定化待機（短縮）
-            time.sleep(2)
+            if (!searchField) return false;
             
-            # 検索フィールドの検出と入力（簡略化）
-            search_success = driver.execute_script("""
-                const searchSelectors = [
-                    '#form_search_input',
-                    'input[id="form_search_input"]',
-                    'input[type="text"]'
-                ];
-                
-                let searchField = null;
-                for (const selector of searchSelectors) {
-                    searchField = document.querySelector(selector);
-                    if (searchField && searchField.offsetParent !== null) {
-                        break;
+            // 検索前の価格要素に目印を付け、新しい検索結果と区別する
+            document.querySelectorAll(arguments[1]).forEach(
+                e => e.setAttribute('data-stale-price', '')
+            );
+            
+            // 再利用された要素の書き換えも検知できるよう、変更された価格要素の目印を外す
+            if (!window.__priceObserver) {
+                window.__priceObserver = new MutationObserver(records => {
+                    for (const record of records) {
+                        const node = record.target.nodeType === Node.TEXT_NODE
+                            ? record.target.parentElement : record.target;
+                        const price = node && node.closest && node.closest("p[class*='NesoBox_text']");
+                        if (price) price.removeAttribute('data-stale-price');
                     }
-                }
-                
-                if (!searchField) return false;
-                
-                searchField.value = '';
-                searchField.focus();
-                searchField.value = arguments[0];
-                searchField.dispatchEvent(new Event('input', { bubbles: true }));
-                
-                const enterEvent = new KeyboardEvent('keydown', {
-                    key: 'Enter',
-                    keyCode: 13,
-                    bubbles: true
                 });
-                searchField.dispatchEvent(enterEvent);
-                
-                return true;
-            """, equipment_name)
+                window.__priceObserver.observe(document.body, {
+                    childList: true, subtree: true, characterData: true
+                });
+            }
+            
+            searchField.value = '';
+            searchField.focus();
+            searchField.value = arguments[0];
+            searchField.dispatchEvent(new Event('input', { bubbles: true }));
+            
+            const enterEvent = new KeyboardEvent('keydown', {
+                key: 'Enter',
+                keyCode: 13,
+                bubbles: true
+            });
+            searchField.dispatchEvent(enterEvent);
+            
+            return true;
+        """, equipment_name, PRICE_NODE_SELECTOR)
 
-            if not search_success:
-                raise Exception("Search field not found")
+        if not search_success:
+            return None
+
+        # 検索結果の価格要素が描画（または書き換え）されるまで待機
+        try:
+            WebDriverWait(driver, 15).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, FRESH_PRICE_SELECTOR))
+            )
+        except TimeoutException:
+            # 該当なし（前回の検索結果が残っていても使用しない）
+            return False
+        
+        # 新しい描画が反映された時点で、内容が同じため書き換わらなかった要素の目印も外す
+        driver.execute_script(
+            "document.querySelectorAll('[data-stale-price]').forEach(e => e.removeAttribute('data-stale-price'));"
+        )
+        return True
 
-            # 検索結果の読み込みを待機（短縮）
-            time.sleep(3)
+    def search_equipment_js(self, driver, equipment_name):
+        """JavaScriptを使用した検索実行（ページ読み込みはドライバーごとに1回）"""
+        try:
+            self.ensure_on_navigator(driver)
+            found = self.perform_search(driver, equipment_name)
+            
+            if found is None:
+                # 画面遷移などで検索フィールドが無い場合は再読み込みして再試行
+                self.ensure_on_navigator(driver, reload=True)
+                found = self.perform_search(driver, equipment_name)
+            
+            if found is None:
+                raise Exception("Search field not found")
+            
+            if not found:
+                # 再利用要素が書き換わらず検知できなかった可能性があるため、再読み込みして1回だけ再検索
+                self.ensure_on_navigator(driver, reload=True)
+                found = self.perform_search(driver, equipment_name)
             
-            return True
+            return bool(found)
 
+        except DRIVER_SESSION_ERRORS:
+            # ドライバー/通信エラーはリトライ判定のため型を維持
+            raise
         except Exception as e:
             raise Exception(f"検索エラー: {equipment_name}, {e}")
 
+    @retry_on_parse_error(max_retries=2)
     def extract_prices(self, driver):
         """価格情報を抽出（7データ+上下限フィルタリング対応版）"""
         try:
-            # 主要セレクターのみ使用
-            price_selectors = [
-                "p._typography-point-body-m-medium_15szf_134._kartrider_3m7yu_9.NesoBox_text__lvOcl",
-                "p._typography-point-body-m-medium_15szf_134"
-            ]
-            
             all_prices = []
             
-            for selector in price_selectors:
-                try:
-                    price_elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                    
-                    if price_elements:
-                        for element in price_elements:
-                            try:
-                                price_text = driver.execute_script(
-                                    "return arguments[0].textContent || '';",
-                                    element
-                                ).strip()
-
-                                if price_text:
-                                    price_match = re.search(r'[\d,]+', price_text)
-                                    if price_match:
-                                        price_str = price_match.group().replace(',', '')
-                                        if price_str.isdigit():
-                                            price = int(price_str)
-                                            if price > 1000:
-                                                all_prices.append(price)
-                            except Exception:
-                                continue
-                        
-                        if all_prices:
-                            break
-                            
-                except Exception:
-                    continue
-
-            # 🔥 修正2: 事前フィルタリング強化
-            pre_filtered = [price for price in all_prices if price > self.minimum_price_threshold]
-            pre_filtered.sort()
-            
-            # 🔥 修正3: 7つのデータを取得（5 → 7）
-            raw_prices = pre_filtered[:7]
+            # 全セレクターのテキストを1回のスクリプト実行でまとめて取得
+            texts_by_selector = driver.execute_script(
+                "return arguments[0].map(sel => Array.from(document.querySelectorAll(sel), e => e.textContent || ''));",
+                PRICE_SELECTORS
+            ) or []
             
-            # 🔥 修正4: 上下限両対応の段階的フィルタリング
-            if len(raw_prices) >= 4:
-                cleaned_prices = self.advanced_outlier_removal(raw_prices)
-                logger.info(f"7データ上下限フィルタリング: {len(raw_prices)}個 → {len(cleaned_prices)}個")
-            else:
-                cleaned_prices = raw_prices
-            
-            # 🔥 修正5: データ不足の基準を調整（2 → 3）
-            if len(cleaned_prices) < 3:
-                logger.warning(f"フィルタリング後データ不足（{len(cleaned_prices)}件）")
+            # 優先順に評価し、価格が取れたセレクターの結果を採用
+            for price_texts in texts_by_selector:
+                for price_text in price_texts:
+                    price = _parse_price_text(price_text)
+                    if price is not None and price > 1000:
+                        all_prices.append(price)
                 
-            return cleaned_prices
+                if all_prices:
+                    break
 
+            prices = self.clean_prices(all_prices)
+            if not prices:
+                # 結果は表示済みのため再抽出しても変わらない
+                raise NonRetryable("価格が見つかりません")
+            return prices
+
+        except NonRetryable:
+            raise
+        except DRIVER_SESSION_ERRORS + (ValueError, AttributeError):
+            # リトライ判定のため型を維持
+            raise
         except Exception as e:
             raise Exception(f"価格抽出エラー: {e}")
 
+    def clean_prices(self, all_prices):
+        """取得した価格の事前フィルタリングと上下限外れ値除去（昇順のリストを返す）"""
+        # 🔥 修正2: 事前フィルタリング強化（ジェネレーターで1パス処理）
+        pre_filtered = (price for price in all_prices if price > self.minimum_price_threshold)
+        
+        # 🔥 修正3: 7つのデータを取得（5 → 7）、全件ソートせず下位7件のみ選択
+        raw_prices = heapq.nsmallest(7, pre_filtered)
+        
+        # 🔥 修正4: 上下限両対応の段階的フィルタリング
+        if len(raw_prices) >= 4:
+            cleaned_prices = self.advanced_outlier_removal(raw_prices)
+            logger.info("7データ上下限フィルタリング: %d個 → %d個", len(raw_prices), len(cleaned_prices))
+        else:
+            cleaned_prices = raw_prices
+        
+        # 🔥 修正5: データ不足の基準を調整（2 → 3）
+        if len(cleaned_prices) < 3:
+            logger.warning("フィルタリング後データ不足（%d件）", len(cleaned_prices))
+            
+        return cleaned_prices
+
     def advanced_outlier_removal(self, prices):
         """上下限両対応の高度外れ値除去（7データ対応版）"""
         if len(prices) < 4:
             return prices
         
         original_prices = prices.copy()
-        logger.info(f"7データ高度フィルタリング開始: {[f'{p:,}' for p in prices]}")
+        log_info = logger.isEnabledFor(logging.INFO)
+        if log_info:
+            logger.info(f"7データ高度フィルタリング開始: {[f'{p:,}' for p in prices]}")
         
         # 🔥 段階1: 相対的下限チェック（重要！）
         prices = self.remove_relative_low_outliers(prices)
@@ -279,12 +577,14 @@ class GitHubActionsUpdater:
         # 🔥 段階4: 最終的な相対チェック
         prices = self.final_relative_check(prices)
         
-        removed_count = len(original_prices) - len(prices)
-        if removed_count > 0:
-            removed_prices = [p for p in original_prices if p not in prices]
-            logger.info(f"7データから除外された価格: {[f'{p:,}' for p in removed_prices]}")
-        
-        logger.info(f"最終7データフィルタリング結果: {[f'{p:,}' for p in sorted(prices)]}")
+        # ログ出力が無効な場合は除外リストの生成・整形を省略
+        if log_info:
+            removed_count = len(original_prices) - len(prices)
+            if removed_count > 0:
+                removed_prices = [p for p in original_prices if p not in prices]
+                logger.info(f"7データから除外された価格: {[f'{p:,}' for p in removed_prices]}")
+            
+            logger.info(f"最終7データフィルタリング結果: {[f'{p:,}' for p in sorted(prices)]}")
         return prices
 
     def remove_relative_low_outliers(self, prices):
@@ -307,7 +607,7 @@ class GitHubActionsUpdater:
         
         filtered = [p for p in prices if p >= final_min_threshold]
         
-        if len(filtered) < len(prices):
+        if len(filtered) < len(prices) and logger.isEnabledFor(logging.INFO):
             removed = [p for p in prices if p < final_min_threshold]
             logger.info(f"7データ相対的下限除外（閾値: {final_min_threshold:,}）: {[f'{p:,}' for p in removed]}")
         
@@ -333,7 +633,7 @@ class GitHubActionsUpdater:
         
         filtered = [p for p in prices if p <= final_max_threshold]
         
-        if len(filtered) < len(prices):
+        if len(filtered) < len(prices) and logger.isEnabledFor(logging.INFO):
             removed = [p for p in prices if p > final_max_threshold]
             logger.info(f"7データ相対的上限除外（閾値: {final_max_threshold:,}）: {[f'{p:,}' for p in removed]}")
         
@@ -344,9 +644,7 @@ class GitHubActionsUpdater:
         if len(prices) < 4:
             return prices
         
-        prices_array = np.array(sorted(prices))
-        Q1 = np.percentile(prices_array, 25)
-        Q3 = np.percentile(prices_array, 75)
+        Q1, Q3 = _quartiles(sorted(prices))
         IQR = Q3 - Q1
         
         if IQR == 0:
@@ -361,12 +659,12 @@ class GitHubActionsUpdater:
         if lower_bound < 0:
             # 最小値の80%を下限とする
             lower_bound = min(prices) * 0.8
-            logger.info(f"7データIQR下限調整: 負値 → {lower_bound:,.0f}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"7データIQR下限調整: 負値 → {lower_bound:,.0f}")
         
-        filtered = [p for p in prices if lower_bound <= p <= upper_bound]
+        filtered, removed = _partition_prices(prices, lower_bound, upper_bound)
         
-        if len(filtered) < len(prices):
-            removed = [p for p in prices if not (lower_bound <= p <= upper_bound)]
+        if removed and logger.isEnabledFor(logging.INFO):
             logger.info(f"7データ厳格IQR除外（{lower_bound:,.0f} - {upper_bound:,.0f}）: {[f'{p:,}' for p in removed]}")
         
         return filtered if len(filtered) >= 3 else prices
@@ -389,8 +687,9 @@ class GitHubActionsUpdater:
             filtered = [p for p in prices if p <= ratio_limit]
             
             if len(filtered) >= 3:
-                removed = [p for p in prices if p > ratio_limit]
-                logger.info(f"7データ最終比率チェック除外（{self.final_price_ratio}倍ルール）: {[f'{p:,}' for p in removed]}")
+                if logger.isEnabledFor(logging.INFO):
+                    removed = [p for p in prices if p > ratio_limit]
+                    logger.info(f"7データ最終比率チェック除外（{self.final_price_ratio}倍ルール）: {[f'{p:,}' for p in removed]}")
                 return filtered
         
         return prices
@@ -400,20 +699,34 @@ class GitHubActionsUpdater:
         if not price_str or price_str in ['未取得', 'undefined', '']:
             return None
         
+        # 文字列はキャッシュ経由（手編集で混入したリスト等のハッシュ不可な値はそのまま変換）
+        if isinstance(price_str, str):
+            return _parse_previous_price_text(price_str)
         try:
-            cleaned_price = str(price_str).replace(',', '').replace(' NESO', '').strip()
-            return int(cleaned_price)
+            return int(str(price_str).translate(_PREVIOUS_PRICE_STRIP))
         except (ValueError, TypeError):
             return None
 
+    def is_recently_updated(self, equipment_info, now):
+        """最終更新からSTALE_HOURS以内に価格更新済みか判定"""
+        if self.stale_hours <= 0:
+            return False
+        
+        # 不正な項目（非文字列のstatus、タイムゾーン付き日時など）は未更新扱いで再取得
+        try:
+            if not equipment_info.get('status', '').startswith('価格更新済み'):
+                return False
+            last_updated = datetime.fromisoformat(equipment_info['last_updated'])
+            return now - last_updated < timedelta(hours=self.stale_hours)
+        except (KeyError, ValueError, TypeError, AttributeError):
+            return False
+
     def detect_outliers_iqr(self, prices):
         """IQR法による外れ値検出（7データ対応厳格版）"""
         if len(prices) < self.minimum_data_points:
             return [], prices
         
-        prices_array = np.array(prices)
-        Q1 = np.percentile(prices_array, 25)
-        Q3 = np.percentile(prices_array, 75)
+        Q1, Q3 = _quartiles(sorted(prices))
         IQR = Q3 - Q1
         
         if IQR == 0:
@@ -423,139 +736,356 @@ class GitHubActionsUpdater:
         lower_bound = Q1 - self.iqr_multiplier * IQR
         upper_bound = Q3 + self.iqr_multiplier * IQR
         
-        outliers = []
-        normal_prices = []
-        
-        for price in prices:
-            if price < lower_bound or price > upper_bound:
-                outliers.append(price)
-            else:
-                normal_prices.append(price)
+        normal_prices, outliers = _partition_prices(prices, lower_bound, upper_bound)
         
         # 🔥 詳細ログ（7データ用）
-        logger.info(f"7データ厳格IQR法（{self.iqr_multiplier}倍）統計:")
-        logger.info(f"  Q1={Q1:,.0f}, Q3={Q3:,.0f}, IQR={IQR:,.0f}")
-        logger.info(f"  境界: {lower_bound:,.0f} - {upper_bound:,.0f}")
-        logger.info(f"  7つ中 外れ値{len(outliers)}件, 正常値{len(normal_prices)}件")
+        logger.info("7データ厳格IQR法（%s倍）: Q1=%.0f, Q3=%.0f, IQR=%.0f, 境界=[%.0f, %.0f], 外れ値%d件, 正常値%d件",
+                    self.iqr_multiplier, Q1, Q3, IQR, lower_bound, upper_bound, len(outliers), len(normal_prices))
         
         return outliers, normal_prices
 
-    def select_optimal_price(self, prices, previous_price):
+    def detect_outliers_iqr_batch(self, price_lists):
+        """IQR法による外れ値検出（全アイテム一括・2次元配列版）"""
+        results = [([], prices) for prices in price_lists]
+        
+        rows = [i for i, prices in enumerate(price_lists) if len(prices) >= self.minimum_data_points]
+        if not rows:
+            return results
+        
+        # 🔥 (アイテム数, 最大データ数) の行列に詰める（不足分はNaN）
+        width = max(len(price_lists[i]) for i in rows)
+        P = np.full((len(rows), width), np.nan)
+        valid = np.zeros((len(rows), width), dtype=bool)
+        for r, i in enumerate(rows):
+            P[r, :len(price_lists[i])] = price_lists[i]
+            valid[r, :len(price_lists[i])] = True
+        
+        Q1, Q3 = np.nanquantile(P, [0.25, 0.75], axis=1)
+        IQR = Q3 - Q1
+        lower_bound = (Q1 - self.iqr_multiplier * IQR)[:, None]
+        upper_bound = (Q3 + self.iqr_multiplier * IQR)[:, None]
+        
+        # NaN同士の比較はFalseになるため、パディング部分は自動的に除外される
+        normal_mask = (P >= lower_bound) & (P <= upper_bound)
+        outlier_mask = valid & ~normal_mask
+        
+        outlier_rows = 0
+        for r, i in enumerate(rows):
+            if IQR[r] == 0:
+                continue
+            prices_array = np.array(price_lists[i])
+            n = len(prices_array)
+            outliers = prices_array[outlier_mask[r, :n]].tolist()
+            results[i] = (outliers, prices_array[normal_mask[r, :n]].tolist())
+            if outliers:
+                outlier_rows += 1
+        
+        logger.info("一括IQR法（%s倍）: %dアイテム中 外れ値を含むアイテム%d件", self.iqr_multiplier, len(rows), outlier_rows)
+        return results
+
+    def select_optimal_price(self, prices, previous_price, iqr_result=None):
         """最適価格の選定（7データ対応版）"""
         if not prices:
             return None, "価格データなし"
 
-        logger.info(f"取得した7つの価格データ: {[f'{p:,}' for p in prices]}")
-        
-        if previous_price:
-            logger.info(f"前回価格: {previous_price:,}")
-        else:
-            logger.info("前回価格: 未取得")
+        # 🔥 価格はclean_pricesで昇順済み（各フィルタは順序を保持）のため先頭が最安値
+        # 価格が狭い範囲に集中している場合は外れ値判定不要（最安値をそのまま採用）
+        if prices[-1] <= prices[0] * self.tight_spread_ratio:
+            return prices[0], "7データ狭幅価格（IQR省略）"
 
-        outliers, normal_prices = self.detect_outliers_iqr(prices)
+        log_info = logger.isEnabledFor(logging.INFO)
+        if log_info:
+            logger.info(f"取得した7つの価格データ: {[f'{p:,}' for p in prices]}")
+            
+            if previous_price:
+                logger.info(f"前回価格: {previous_price:,}")
+            else:
+                logger.info("前回価格: 未取得")
+
+        if iqr_result is None:
+            iqr_result = self.detect_outliers_iqr(prices)
+        outliers, normal_prices = iqr_result
         
-        # 🔥 7データでの詳細分析
-        logger.info("7データIQR法による外れ値検出結果:")
-        for i, price in enumerate(prices, 1):
-            status = "外れ値" if price in outliers else "正常値"
-            logger.info(f"  {i}/7: {price:,} NESO - {status}")
+        # 🔥 7データでの詳細分析（1アイテム1行、書式化はログ出力時のみ）
+        logger.info("7データIQR法による外れ値検出結果: 正常値=%s 外れ値=%s", normal_prices, outliers)
 
         if not normal_prices:
             logger.warning("全ての価格が外れ値と判定されました（7データ）")
             
             if previous_price and previous_price > self.minimum_price_threshold:
-                logger.info(f"前回価格を維持: {previous_price:,}")
+                if log_info:
+                    logger.info(f"前回価格を維持: {previous_price:,}")
                 return previous_price, "前回価格維持（全価格外れ値・7データ）"
             else:
                 median_price = int(np.median(prices))
                 logger.warning(f"中央値を使用: {median_price:,}")
                 return median_price, "中央値使用（全価格外れ値・7データ）"
 
-        optimal_price = min(normal_prices)
-        excluded_count = len(outliers)
-        
-        if excluded_count > 0:
-            logger.info(f"7データから{excluded_count}件を外れ値として除外")
+        # 正常値も元の昇順を保持しているため先頭が最小
+        optimal_price = normal_prices[0]
         
-        logger.info(f"選定された最適価格（7データ上下限解析）: {optimal_price:,}")
+        if log_info:
+            if outliers:
+                logger.info("7データから%d件を外れ値として除外", len(outliers))
+            
+            logger.info(f"選定された最適価格（7データ上下限解析）: {optimal_price:,}")
         
         return optimal_price, "7データ上下限フィルタリング正常価格"
 
-    @retry_on_error(max_retries=2, delay=1)
+    def rate_limit_wait_time(self):
+        """429受信後のバックオフ期間の残り秒数"""
+        with self.lock:
+            return self._throttle_until - time.monotonic()
+
+    def wait_for_rate_limit(self):
+        """429受信後のバックオフ期間中であれば再開時刻まで待機"""
+        wait = self.rate_limit_wait_time()
+        if wait > 0:
+            time.sleep(wait)
+
+    def update_rate_limit(self, status_code):
+        """レスポンスのステータスに応じてバックオフ間隔を更新（429で倍増、待機期間経過後の成功でリセット）"""
+        with self.lock:
+            now = time.monotonic()
+            if status_code == 429:
+                self._throttle_backoff = min(max(self._throttle_backoff * 2, 0.5), 30.0)
+                self._throttle_until = now + self._throttle_backoff
+                logger.warning(f"429 Too Many Requests: {self._throttle_backoff:.1f}秒待機")
+            elif now >= self._throttle_until:
+                # 429以前に送信済みの並行リクエストの成功では倍増をリセットしない
+                self._throttle_backoff = 0.0
+
+    def fetch_prices_api(self, equipment_name):
+        """価格APIから装備の価格データを取得（Chrome不要）"""
+        url = self.price_api_url.format(name=quote(equipment_name))
+        # 429はバックオフ期間を待ってから再試行（すぐSeleniumに回すと同じサイトに負荷をかけ続ける）
+        for _ in range(self.api_429_retries + 1):
+            with self.rate_limiter:
+                self.wait_for_rate_limit()
+                response = self.session.get(url, timeout=15)
+            self.update_rate_limit(response.status_code)
+            if response.status_code != 429:
+                break
+        response.raise_for_status()
+        
+        return self.prices_from_api_response(response.json())
+
+    def prices_from_api_response(self, data):
+        """価格APIのJSONレスポンスから価格リストを作成"""
+        all_prices = []
+        for value in _collect_json_prices(data, self.price_api_field):
+            price = int(value) if isinstance(value, (int, float)) else _parse_price_text(value)
+            if price is not None and price > 1000:
+                all_prices.append(price)
+        
+        return self.clean_prices(all_prices)
+
+    async def fetch_prices_api_async(self, session, semaphore, equipment_name):
+        """価格APIから装備の価格データを非同期取得（失敗時はNone）"""
+        url = self.price_api_url.format(name=quote(equipment_name))
+        try:
+            async with semaphore:
+                # 429はバックオフ期間を待ってから再試行
+                for attempt in range(self.api_429_retries + 1):
+                    wait = self.rate_limit_wait_time()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    async with session.get(url) as response:
+                        self.update_rate_limit(response.status)
+                        if response.status == 429 and attempt < self.api_429_retries:
+                            continue
+                        response.raise_for_status()
+                        data = await response.json(content_type=None)
+                        break
+            return self.prices_from_api_response(data)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.warning(f"API取得失敗、Seleniumで取得: {equipment_name}: {e}")
+            return None
+
+    async def fetch_all_prices_api(self, items):
+        """全アイテムの価格を価格APIから並行取得（Chromeを使わずに処理）"""
+        semaphore = asyncio.Semaphore(self.api_concurrency)
+        connector = aiohttp.TCPConnector(limit=self.api_concurrency, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=15)
+        headers = {'User-Agent': USER_AGENT, 'Accept': 'application/json'}
+        
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+            return await asyncio.gather(*[
+                self.fetch_prices_api_async(session, semaphore, equipment_name)
+                for _, equipment_name, _ in items
+            ])
+
+    def get_driver(self):
+        """現在のワーカースレッドのドライバーを取得（未起動なら起動）"""
+        driver = getattr(self._tls, 'driver', None)
+        if driver is None:
+            driver = self.setup_driver()
+            self._tls.driver = driver
+            with self.lock:
+                self._drivers.append(driver)
+        return driver
+
+    def release_driver(self):
+        """現在のワーカースレッドのドライバーを終了"""
+        driver = getattr(self._tls, 'driver', None)
+        self._tls.driver = None
+        if driver:
+            with self.lock:
+                self._drivers.remove(driver)
+            try:
+                driver.quit()
+            except:
+                pass
+
+    def release_all_drivers(self):
+        """全ワーカーのドライバーを終了（スレッドプール終了後に呼び出す）"""
+        with self.lock:
+            drivers, self._drivers = self._drivers, []
+        # 呼び出し元スレッド（シングルスレッド処理）が終了済みのドライバーを再利用しないよう解除
+        # （ワーカースレッドはスレッドプールと共に終了済み）
+        self._tls.driver = None
+        for driver in drivers:
+            try:
+                driver.quit()
+            except:
+                pass
+
+    @retry_on_network_error(max_retries=2, delay=1)
+    def fetch_prices(self, equipment_name):
+        """ワーカーのドライバーで装備の価格データを取得（読み込み済みページを再利用）"""
+        driver = self.get_driver()
+        try:
+            self.wait_for_rate_limit()
+            if not self.search_equipment_js(driver, equipment_name):
+                # 検索結果なしは再試行しても変わらないためリトライ対象外
+                raise NonRetryable("検索結果なし")
+
+            return self.extract_prices(driver)
+        except NonRetryable:
+            # ドライバーは正常なため再利用
+            raise
+        except Exception:
+            # 異常状態の可能性があるドライバーは破棄し、リトライ時・次アイテムで再起動
+            self.release_driver()
+            raise
+
     def update_equipment_price_with_retry(self, equipment_id, equipment_name, current_equipment_data):
         """装備価格の更新（7データ対応版）"""
-        driver = None
         try:
             previous_price = self.parse_previous_price(
                 current_equipment_data.get('item_price', '')
             )
             
-            driver = self.setup_driver()
+            prices = None
+            if self.price_api_url and not self.use_async_api:
+                try:
+                    prices = self.fetch_prices_api(equipment_name)
+                except (requests.RequestException, ValueError) as e:
+                    logger.warning(f"API取得失敗、Seleniumで取得: {equipment_name}: {e}")
             
-            if not self.search_equipment_js(driver, equipment_name):
-                raise Exception("検索失敗")
-
-            prices = self.extract_prices(driver)
+            # 通信エラーはfetch_prices、解析エラーはextract_pricesでリトライ
             if not prices:
-                raise Exception("価格が見つかりません")
+                prices = self.fetch_prices(equipment_name)
 
-            optimal_price, price_status = self.select_optimal_price(prices, previous_price)
-            
-            if optimal_price:
-                with self.lock:
-                    logger.info(f"Success: {equipment_name}: {optimal_price:,} NESO ({price_status})")
-                return {
-                    'equipment_id': equipment_id,
-                    'equipment_name': equipment_name,
-                    'price': optimal_price,
-                    'price_status': price_status,
-                    'success': True
-                }
-            else:
-                raise Exception("適切な価格が選定できません")
+            # 価格選定は全アイテム取得後に一括で実行（select_prices_batch）
+            result = {
+                'equipment_id': equipment_id,
+                'equipment_name': equipment_name,
+                'prices': prices,
+                'previous_price': previous_price,
+                'success': True
+            }
+            self.record_update(result)
+            return result
 
         except Exception as e:
-            with self.lock:
-                logger.error(f"Failed: {equipment_name}: {str(e)}")
+            logger.error(f"Failed: {equipment_name}: {str(e)}")
             return {
                 'equipment_id': equipment_id,
                 'equipment_name': equipment_name,
                 'success': False,
                 'error': str(e)
             }
-        finally:
-            if driver:
+
+    def record_update(self, result):
+        """取得済み価格を追記ログに1行ずつ書き込み（ワーカー間はロックで排他）"""
+        if self._updates_log is None:
+            return
+        try:
+            line = json.dumps({
+                'id': result['equipment_id'],
+                'name': result['equipment_name'],
+                'prices': result['prices'],
+                'previous_price': result['previous_price'],
+                'ts': datetime.now().isoformat()
+            }, ensure_ascii=False)
+            with self.lock:
+                self._updates_log.write(line + "\n")
+        except (OSError, TypeError, ValueError) as e:
+            # 追記ログは再開用の補助情報のため、書き込み失敗で取得結果を失敗扱いにしない
+            logger.warning(f"追記ログの書き込み失敗: {result['equipment_name']}: {e}")
+
+    def load_pending_updates(self):
+        """前回の異常終了で残った追記ログから取得済み価格を読み込み"""
+        pending = {}
+        if not os.path.exists(self.updates_log_path):
+            return pending
+        
+        cutoff = datetime.now() - UPDATES_LOG_MAX_AGE
+        with open(self.updates_log_path, 'r', encoding='utf-8') as f:
+            for line in f:
                 try:
-                    driver.quit()
-                except:
-                    pass
-
-    def process_equipment_batch(self, equipment_items):
-        """装備アイテムのバッチ処理（7データ対応版）"""
-        results = []
-        for equipment_id, equipment_info in equipment_items:
-            equipment_name = equipment_info.get("item_name", "")
-            if not equipment_name:
-                continue
+                    entry = json.loads(line)
+                    if datetime.fromisoformat(entry['ts']) < cutoff:
+                        continue
+                    pending[entry['id']] = {
+                        'equipment_id': entry['id'],
+                        'equipment_name': entry['name'],
+                        'prices': entry['prices'],
+                        'previous_price': entry['previous_price'],
+                        'success': True
+                    }
+                except (ValueError, KeyError, TypeError):
+                    # 書き込み途中で終了した行・項目が欠けた行は無視
+                    continue
+        return pending
 
-            try:
-                result = self.update_equipment_price_with_retry(
-                    equipment_id, equipment_name, equipment_info
-                )
-                results.append(result)
-                    
-            except Exception as e:
-                results.append({
-                    'equipment_id': equipment_id,
-                    'equipment_name': equipment_name,
-                    'success': False,
-                    'error': str(e)
-                })
+    def select_prices_batch(self, results):
+        """取得済み価格データから最適価格を一括選定"""
+        fetched = [result for result in results if result.get('success')]
+        iqr_results = self.detect_outliers_iqr_batch([result['prices'] for result in fetched])
+        
+        for result, iqr_result in zip(fetched, iqr_results):
+            optimal_price, price_status = self.select_optimal_price(
+                result['prices'], result['previous_price'], iqr_result
+            )
+            
+            if optimal_price:
+                logger.info(f"Success: {result['equipment_name']}: {optimal_price:,} NESO ({price_status})")
+                result['price'] = optimal_price
+                result['price_status'] = price_status
+            else:
+                logger.error(f"Failed: {result['equipment_name']}: 適切な価格が選定できません")
+                result['success'] = False
+                result['error'] = "適切な価格が選定できません"
 
-            # 高速化：待機時間短縮
-            time.sleep(1)
+    def process_equipment_item(self, item):
+        """装備アイテム1件の処理（ワーカーのドライバーを再利用）"""
+        equipment_id, equipment_name, equipment_info = item
+        
+        try:
+            result = self.update_equipment_price_with_retry(
+                equipment_id, equipment_name, equipment_info
+            )
+        except Exception as e:
+            result = {
+                'equipment_id': equipment_id,
+                'equipment_name': equipment_name,
+                'success': False,
+                'error': str(e)
+            }
 
-        return results
+        return result
 
     def run_update(self):
         """価格更新実行（7データ並列処理版）"""
@@ -574,95 +1104,166 @@ class GitHubActionsUpdater:
         logger.info(f"  下限除去: 中央値の1/{self.median_min_ratio}, 上位3つ平均の1/{self.top3_min_ratio}")
         logger.info(f"  上限除去: 中央値の{self.median_max_ratio}倍, 下位3つ平均の{self.bottom3_max_ratio}倍")
         logger.info(f"  最終比率: {self.final_price_ratio}倍以内")
+        if self.stale_hours > 0:
+            logger.info(f"  更新スキップ: {self.stale_hours}時間以内に更新済みのアイテム")
         
         try:
             if not os.path.exists("data"):
                 os.makedirs("data", exist_ok=True)
             
-            with open(self.json_file_path, 'r', encoding='utf-8') as f:
-                equipment_data = json.load(f)
+            if ORJSON_AVAILABLE:
+                with open(self.json_file_path, 'rb') as f:
+                    equipment_data = orjson.loads(f.read())
+            else:
+                with open(self.json_file_path, 'r', encoding='utf-8') as f:
+                    equipment_data = json.load(f)
         except Exception as e:
             logger.error(f"JSON loading failed: {e}")
             sys.exit(1)
 
-        items = [(k, v) for k, v in equipment_data.items() 
-                if v.get("item_name") and k != ""]
-        
-        if self.target_items is not None:
-            items = items[:self.target_items]
+        # 対象件数指定時は先頭から必要な件数だけを走査
+        now = datetime.now()
+        # (ID, 装備名, 装備情報) を先に確定し、以降の処理で装備名を再取得しない
+        items = ((k, v["item_name"], v) for k, v in equipment_data.items() 
+                 if k and v.get("item_name") and not self.is_recently_updated(v, now))
+        items = list(islice(items, self.target_items))
+        # 名前順に処理（前方一致の近い検索が連続するよう並べ替え）
+        items.sort(key=lambda item: item[1])
 
         total = len(items)
         logger.info(f"Processing {total} items with 7-data filtering")
+        if total == 0:
+            # 全件がスキップ対象（STALE_HOURS以内に更新済み）の場合はJSONを書き換えずに終了
+            logger.info("更新対象のアイテムがありません（全件更新済み）")
+            return
+
+        # 前回中断時の取得済みアイテムは再取得しない
+        all_results = []
+        pending_updates = self.load_pending_updates() if self.journal_updates else {}
+        if pending_updates:
+            remaining = []
+            for item in items:
+                if item[0] in pending_updates:
+                    all_results.append(pending_updates[item[0]])
+                else:
+                    remaining.append(item)
+            logger.info(f"前回中断時の取得結果を再利用: {len(all_results)}件")
+            items = remaining
+        
+        # 行単位でフラッシュし、異常終了時も書き込み済みの行を残す
+        if self.journal_updates:
+            try:
+                self._updates_log = open(self.updates_log_path, 'a', encoding='utf-8', buffering=1)
+            except OSError as e:
+                logger.warning(f"追記ログを開けないため中断再開なしで実行: {e}")
+        
+        if self.use_async_api and items:
+            # 価格APIから全件を非同期で先行取得し、取得できなかった分のみSeleniumで処理
+            logger.info(f"価格API非同期取得開始: 同時接続{self.api_concurrency}, {total}件")
+            api_prices = asyncio.run(self.fetch_all_prices_api(items))
+            remaining = []
+            for item, prices in zip(items, api_prices):
+                equipment_id, equipment_name, equipment_info = item
+                if prices:
+                    result = {
+                        'equipment_id': equipment_id,
+                        'equipment_name': equipment_name,
+                        'prices': prices,
+                        'previous_price': self.parse_previous_price(equipment_info.get('item_price', '')),
+                        'success': True
+                    }
+                    self.record_update(result)
+                    all_results.append(result)
+                else:
+                    remaining.append(item)
+            logger.info(f"価格API取得完了: {len(items) - len(remaining)}件, Selenium処理対象: {len(remaining)}件")
+            items = remaining
 
         # 並行処理復活
-        if self.use_parallel and total > 10:
-            # バッチサイズを動的に調整
-            batch_size = max(10, total // self.max_workers)
-            batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
-
-            logger.info(f"7データ並行処理開始: {self.max_workers}ワーカー, {len(batches)}バッチ")
-
-            all_results = []
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                futures = {
-                    executor.submit(self.process_equipment_batch, batch): idx
-                    for idx, batch in enumerate(batches, start=1)
-                }
+        pending = len(items)
+        if self.use_parallel and pending > 10:
+            # アイテム単位で投入し、空いたワーカーから順に処理（偏りによる待ちを防止）
+            logger.info(f"7データ並行処理開始: {self.max_workers}ワーカー, {pending}件")
 
-                for future in as_completed(futures):
-                    batch_no = futures[future]
-                    try:
-                        results = future.result()
-                        all_results.extend(results)
-                        logger.info(f"7データバッチ{batch_no} 完了 ({len(results)}件)")
-                    except Exception as e:
-                        logger.error(f"7データバッチ{batch_no} エラー: {e}")
+            try:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    futures = [executor.submit(self.process_equipment_item, item) for item in items]
+                    # 完了順に回収し、遅いアイテムで進捗ログが止まらないようにする
+                    for i, future in enumerate(as_completed(futures), 1):
+                        result = future.result()
+                        all_results.append(result)
+                        logger.info(f"[{i}/{pending}] 7データ処理完了: {result['equipment_name']}")
+            finally:
+                self.release_all_drivers()
 
         else:
             # シングルスレッド処理
-            all_results = []
-            for i, (equipment_id, equipment_info) in enumerate(items, 1):
-                equipment_name = equipment_info.get("item_name", "")
-                logger.info(f"[{i}/{total}] 7データ処理: {equipment_name}")
-                
-                result = self.update_equipment_price_with_retry(
-                    equipment_id, equipment_name, equipment_info
-                )
-                all_results.append(result)
-                
-                # 高速化：短い待機時間
-                time.sleep(2)
+            try:
+                for i, (equipment_id, equipment_name, equipment_info) in enumerate(items, 1):
+                    logger.info(f"[{i}/{pending}] 7データ処理: {equipment_name}")
+                    
+                    result = self.update_equipment_price_with_retry(
+                        equipment_id, equipment_name, equipment_info
+                    )
+                    all_results.append(result)
+            finally:
+                self.release_all_drivers()
+
+        self.select_prices_batch(all_results)
 
         # JSONデータに反映
         normal_updates = 0
         filtered_updates = 0
         failed_updates = 0
         
+        # 更新日時は実行単位で共通
+        now_iso = datetime.now().isoformat()
+        
         for result in all_results:
+            entry = equipment_data[result['equipment_id']]
             if result.get('success'):
-                equipment_data[result['equipment_id']]["item_price"] = f"{result['price']:,}"
+                entry["item_price"] = f"{result['price']:,}"
                 
                 price_status = result.get('price_status', '')
                 if '上下限' in price_status or '7データ' in price_status:
-                    equipment_data[result['equipment_id']]["status"] = f"価格更新済み（{price_status}）"
+                    entry["status"] = f"価格更新済み（{price_status}）"
                     filtered_updates += 1
                 else:
-                    equipment_data[result['equipment_id']]["status"] = "価格更新済み"
+                    entry["status"] = "価格更新済み"
                     normal_updates += 1
                     
-                equipment_data[result['equipment_id']]["last_updated"] = datetime.now().isoformat()
-                self.updated_count += 1
+                entry["last_updated"] = now_iso
             else:
-                equipment_data[result['equipment_id']]["status"] = "価格取得失敗"
+                entry["status"] = "価格取得失敗"
                 failed_updates += 1
+        
+        # 集計は全ワーカー終了後のメインスレッドでのみ行う
+        self.updated_count = normal_updates + filtered_updates
 
         try:
-            with open(self.json_file_path, 'w', encoding='utf-8') as f:
-                json.dump(equipment_data, f, ensure_ascii=False, indent=2)
+            # 一時ファイルに書き出してから置き換え（中断時に書きかけのJSONを残さない）
+            tmp_path = self.json_file_path + '.tmp'
+            if ORJSON_AVAILABLE:
+                # UTF-8バイト列をそのまま書き込み（デコード/再エンコードを省略）
+                with open(tmp_path, 'wb', buffering=1 << 20) as f:
+                    f.write(orjson.dumps(equipment_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            else:
+                with open(tmp_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                    json.dump(equipment_data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.json_file_path)
             logger.info(f"JSON saved successfully: {self.updated_count} items updated")
         except Exception as e:
             logger.error(f"Failed to save JSON: {e}")
             sys.exit(1)
+        
+        # 保存済みのため追記ログは不要
+        if self._updates_log is not None:
+            try:
+                self._updates_log.close()
+                os.remove(self.updates_log_path)
+            except OSError as e:
+                logger.warning(f"追記ログの削除失敗: {e}")
+            self._updates_log = None
 
         elapsed_time = time.time() - start_time
         logger.info("=" * 50)